@@ -0,0 +1,14 @@
+import os
+from functools import lru_cache
+from dotenv import load_dotenv
+
+# Set once .env has been loaded, so reloaded modules (e.g. DevUI reloads) skip it too
+_ENV_LOADED_KEY = "_VM_SNOOZE_ENV_LOADED"
+
+
+@lru_cache(maxsize=1)
+def ensure_env_loaded() -> None:
+    """Load .env into the environment once per process."""
+    if not os.environ.get(_ENV_LOADED_KEY):
+        load_dotenv(override=True)
+        os.environ[_ENV_LOADED_KEY] = "1"
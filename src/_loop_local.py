@@ -0,0 +1,69 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _LoopSlot:
+    """The values created in one event loop and the exit stack that closes them."""
+    __slots__ = ("lock", "exit_stack", "values")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.exit_stack = AsyncExitStack()
+        self.values: dict[Hashable, object] = {}
+
+
+class LoopLocal(Generic[T]):
+    """Shared values created once per event loop and key, on first use.
+
+    Async clients and sessions are bound to the event loop that created them, so each loop
+    gets its own values. Values are never closed while the loop that owns them may still
+    use them: aclose() only closes those of the running loop, and the values of a loop that
+    has been closed are dropped without closing, as their cleanup can no longer run.
+    """
+
+    def __init__(self) -> None:
+        self._slots: dict[asyncio.AbstractEventLoop, _LoopSlot] = {}
+
+    def _slot(self) -> _LoopSlot:
+        loop = asyncio.get_running_loop()
+        slot = self._slots.get(loop)
+        if slot is None:
+            for closed_loop in [other for other in self._slots if other.is_closed()]:
+                del self._slots[closed_loop]
+            slot = self._slots[loop] = _LoopSlot()
+        return slot
+
+    async def get(self, factory: Callable[[AsyncExitStack], Awaitable[T]], key: Hashable = None) -> T:
+        """Return the value for a key in the running loop, creating it on first use.
+
+        Args:
+            factory (Callable[[AsyncExitStack], Awaitable[T]]): Creates the value and enters
+                its async context managers on the given exit stack.
+            key (Hashable): Distinguishes values created with different settings.
+        Returns:
+            T: The shared value.
+        """
+        slot = self._slot()
+        if key in slot.values:
+            return slot.values[key]
+
+        async with slot.lock:
+            if key not in slot.values:
+                exit_stack = AsyncExitStack()
+                try:
+                    value = await factory(exit_stack)
+                except BaseException:
+                    await exit_stack.aclose()
+                    raise
+                slot.exit_stack.push_async_exit(exit_stack)
+                slot.values[key] = value
+        return slot.values[key]
+
+    async def aclose(self) -> None:
+        """Close every value created in the running loop."""
+        slot = self._slots.pop(asyncio.get_running_loop(), None)
+        if slot is not None:
+            await slot.exit_stack.aclose()
@@ -0,0 +1,24 @@
+from contextlib import AsyncExitStack
+from azure.identity.aio import DefaultAzureCredential
+from _loop_local import LoopLocal
+
+# Shared Azure credential, created once per event loop and used by every client that needs one
+_credentials: LoopLocal[DefaultAzureCredential] = LoopLocal()
+
+
+async def _create_credential(exit_stack: AsyncExitStack) -> DefaultAzureCredential:
+    return await exit_stack.enter_async_context(DefaultAzureCredential())
+
+
+async def get_async_credential() -> DefaultAzureCredential:
+    """Return the shared async DefaultAzureCredential, creating it on first use in the running loop.
+
+    Returns:
+        DefaultAzureCredential: The async credential for the running event loop.
+    """
+    return await _credentials.get(_create_credential)
+
+
+async def close_async_credential() -> None:
+    """Close the shared async credential of the running event loop, if it was created."""
+    await _credentials.aclose()
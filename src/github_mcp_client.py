@@ -1,48 +1,226 @@
 import os
+import time
+import orjson
+import hashlib
 import asyncio
-from agent_framework import ChatAgent, MCPStreamableHTTPTool, ai_function
+import logging
+import httpx
+from functools import partial
+from pathlib import Path
+from contextlib import AsyncExitStack
+from agent_framework import AgentRunResponse, AIFunction, ChatAgent, MCPStreamableHTTPTool, ai_function
 from agent_framework.azure import AzureAIAgentClient
-from azure.identity.aio import DefaultAzureCredential
-from dotenv import load_dotenv
+from credentials import close_async_credential, get_async_credential
+from _loop_local import LoopLocal
+from _env import ensure_env_loaded
+from mcp import types
+from pydantic import BaseModel, ValidationError
 
-load_dotenv(override=True)
+try:
+    # Private helpers used to rebuild tools from the cached catalog; without them the cache is bypassed
+    from agent_framework._mcp import _get_input_model_from_mcp_tool, _normalize_mcp_name
+except ImportError:
+    _get_input_model_from_mcp_tool = _normalize_mcp_name = None
 
+try:
+    import uvloop
+except ImportError:  # uvloop does not support Windows
+    uvloop = None
 
-@ai_function(name="github_mcp", description="Call GitHub MCP server with a prompt and return the response.")
-async def call_github_mcp(prompt: str) -> str:
-    """Example using an HTTP-based MCP server."""
-    async with (
-        DefaultAzureCredential() as credential,
-        MCPStreamableHTTPTool(
+logger = logging.getLogger(__name__)
+
+# On-disk cache of the GitHub MCP tools/list response
+TOOLS_CACHE_PATH = Path.home() / ".cache" / "vm-snooze" / "github-mcp-tools.json"
+TOOLS_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Shared GitHub MCP session, created once per event loop and reused by every call
+_agents: LoopLocal[tuple[ChatAgent, MCPStreamableHTTPTool]] = LoopLocal()
+
+
+def create_http2_client(
+    headers: dict[str, str] | None = None,
+    timeout: httpx.Timeout | None = None,
+    auth: httpx.Auth | None = None,
+) -> httpx.AsyncClient:
+    """Create the MCP transport client with HTTP/2 and a keep-alive connection pool.
+
+    Matches the signature of ``mcp.shared._httpx_utils.create_mcp_http_client`` so it
+    can be passed as ``httpx_client_factory`` to the streamable HTTP client.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=300),
+        follow_redirects=True,
+        headers=headers,
+        timeout=timeout if timeout is not None else httpx.Timeout(30.0),
+        auth=auth,
+    )
+
+
+class CachedMCPStreamableHTTPTool(MCPStreamableHTTPTool):
+    """MCP streamable HTTP tool that caches the server's tool catalog on disk.
+
+    The tools/list response is stored per (url, Authorization header) and reused
+    until it expires, so new sessions skip the tools/list round-trip.
+    """
+
+    def _tools_cache_key(self) -> str:
+        authorization = str(self.headers.get("Authorization", ""))
+        return hashlib.sha256(f"{self.url}|{authorization}".encode()).hexdigest()
+
+    def _read_cached_tools(self) -> types.ListToolsResult | None:
+        try:
+            cached = orjson.loads(TOOLS_CACHE_PATH.read_bytes())
+            if cached.get("key") != self._tools_cache_key():
+                return None
+            if time.time() - cached.get("created_at", 0) > TOOLS_CACHE_TTL_SECONDS:
+                return None
+            return types.ListToolsResult.model_validate(cached["tools"])
+        except (OSError, ValueError, KeyError, AttributeError, ValidationError):
+            return None
+
+    def _write_cached_tools(self, tool_list: types.ListToolsResult) -> None:
+        try:
+            TOOLS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            TOOLS_CACHE_PATH.write_bytes(orjson.dumps({
+                "key": self._tools_cache_key(),
+                "created_at": time.time(),
+                "tools": tool_list.model_dump(mode="json"),
+            }))
+        except OSError:
+            pass
+
+    async def load_tools(self, use_cache: bool = True) -> None:
+        """Load tools from the on-disk cache, falling back to the MCP server.
+
+        Args:
+            use_cache (bool): Whether a cached catalog may be used instead of asking the server.
+        """
+        if _get_input_model_from_mcp_tool is None or _normalize_mcp_name is None:
+            await super().load_tools()
+            return
+
+        tool_list = self._read_cached_tools() if use_cache else None
+        if tool_list is None:
+            try:
+                tool_list = await self.session.list_tools()
+            except Exception:
+                # Let the base class handle and report the failure
+                await super().load_tools()
+                return
+            self._write_cached_tools(tool_list)
+
+        for tool in tool_list.tools:
+            local_name = _normalize_mcp_name(tool.name)
+            self._functions.append(AIFunction(
+                func=partial(self.call_tool, tool.name),
+                name=local_name,
+                description=tool.description or "",
+                approval_mode=self._determine_approval_mode(local_name),
+                input_model=_get_input_model_from_mcp_tool(tool),
+            ))
+
+    async def message_handler(self, message) -> None:
+        """Reload the tools from the server, not the cache, when the server reports a change."""
+        if (isinstance(message, types.ServerNotification)
+                and message.root.method == "notifications/tools/list_changed"):
+            # Replace the loaded functions instead of appending the new catalog to them
+            self._functions.clear()
+            await self.load_tools(use_cache=False)
+            if self.load_prompts_flag:
+                await self.load_prompts()
+            return
+        await super().message_handler(message)
+
+
+async def _create_agent(exit_stack: AsyncExitStack) -> tuple[ChatAgent, MCPStreamableHTTPTool]:
+    mcp_server = await exit_stack.enter_async_context(
+        CachedMCPStreamableHTTPTool(
             name="GitHub MCP Server",
             url="https://api.githubcopilot.com/mcp",
             headers={
                 "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
                 "Content-Type": "application/json"
             },
-        ) as mcp_server,
+            load_prompts=False,
+            httpx_client_factory=create_http2_client,
+        )
+    )
+    agent = await exit_stack.enter_async_context(
         ChatAgent(
             chat_client=AzureAIAgentClient(
-                async_credential=credential,
+                async_credential=await get_async_credential(),
                 model_deployment_name="gpt-4.1-mini"
             ),
             name="GitHub Agent",
             instructions="You help with GitHub related tasks.",
-        ) as agent,
-    ):
-        print("Calling GitHub MCP Server...")
-        result = await agent.run(
-            messages=prompt,
-            tools=mcp_server
         )
-        print("Result from GitHub MCP Server:", result)
-        return result
+    )
+    return agent, mcp_server
+
+
+async def get_agent() -> tuple[ChatAgent, MCPStreamableHTTPTool]:
+    """Return the shared GitHub agent and MCP server, connecting on first use.
+
+    The MCP session and agent are bound to the event loop that created them, so
+    each event loop gets its own.
+
+    Returns:
+        tuple[ChatAgent, MCPStreamableHTTPTool]: The connected agent and MCP server.
+    """
+    return await _agents.get(_create_agent)
+
+
+async def close_github_mcp() -> None:
+    """Close the shared GitHub agent and MCP session of the running event loop.
+
+    Called by scripts that own their event loop. The DevUI server in main.py offers no
+    shutdown hook to call it from, so there the session ends with the process.
+    """
+    await _agents.aclose()
+
+
+async def run_github_mcp(prompt: str, response_format: type[BaseModel] | None = None) -> AgentRunResponse:
+    """Run a prompt against the GitHub MCP server.
+
+    Args:
+        prompt (str): The prompt to send to the GitHub agent.
+        response_format (type[BaseModel] | None): Optional structured output schema.
+    Returns:
+        AgentRunResponse: The agent's response, with the parsed ``value`` if a response_format is given.
+    """
+    agent, mcp_server = await get_agent()
+    logger.debug("Calling GitHub MCP Server...")
+    result = await agent.run(
+        messages=prompt,
+        tools=mcp_server,
+        response_format=response_format
+    )
+    logger.debug("Result from GitHub MCP Server: %s", result)
+    return result
+
+
+@ai_function(name="github_mcp", description="Call GitHub MCP server with a prompt and return the response.")
+async def call_github_mcp(prompt: str) -> str:
+    """Example using an HTTP-based MCP server."""
+    return await run_github_mcp(prompt)
+
+
+async def _main(prompt: str) -> str:
+    try:
+        return await call_github_mcp(prompt)
+    finally:
+        await close_github_mcp()
+        await close_async_credential()
 
 
 if __name__ == "__main__":
-    prompt = ("""              
-        Search through repository files in https://github.com/HosseinZahed/stu-copilot repository. 
+    ensure_env_loaded()
+    prompt = ("""
+        Search through repository files in https://github.com/HosseinZahed/stu-copilot repository.
         You must return only one word: 'terraform' if any .tf file is present, 'bicep' if any .bicep file is present, or 'none' otherwise.
         """)
-    result = asyncio.run(call_github_mcp(prompt))
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    result = asyncio.run(_main(prompt))
     print("Result from GitHub MCP:", result)
@@ -0,0 +1,182 @@
+import os
+import re
+import httpx
+import orjson
+from contextlib import AsyncExitStack
+from urllib.parse import quote, urlparse
+from _loop_local import LoopLocal
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Directories whose files are not the repository's own infrastructure code (hidden directories are skipped too)
+_EXCLUDED_DIRS = frozenset({
+    "node_modules", "venv", ".venv", "__pycache__", ".git", "target", "dist", "build",
+    ".terraform", ".mypy_cache", ".pytest_cache", ".tox", ".gradle",
+})
+
+# IaC type of each infrastructure code file extension
+_IAC_TYPE_BY_EXTENSION = {"bicep": "bicep", "tf": "terraform"}
+_IAC_SUFFIXES = tuple(f".{extension}" for extension in _IAC_TYPE_BY_EXTENSION)
+
+# Terraform provider block naming the cloud provider
+TERRAFORM_PROVIDER_PATTERN = re.compile(r'provider\s+"(azurerm|aws)"')
+
+# Shared GitHub REST client, created once per event loop and reused by every call
+_clients: LoopLocal[httpx.AsyncClient] = LoopLocal()
+
+
+async def _create_client(exit_stack: AsyncExitStack) -> httpx.AsyncClient:
+    return await exit_stack.enter_async_context(httpx.AsyncClient(
+        base_url=GITHUB_API_URL,
+        headers={"Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}"},
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=60),
+        timeout=10,
+    ))
+
+
+async def _get_client() -> httpx.AsyncClient:
+    """Return the shared GitHub REST client of the running event loop, creating it on first use."""
+    return await _clients.get(_create_client)
+
+
+def parse_repository_url(repository_url: str) -> tuple[str, str]:
+    """Split a GitHub repository URL into owner and repository name.
+
+    Args:
+        repository_url (str): The repository URL (e.g., "https://github.com/owner/repo").
+    Returns:
+        tuple[str, str]: The owner and repository name.
+    """
+    parts = urlparse(repository_url).path.strip("/").split("/")
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        raise ValueError(f"Invalid GitHub repository URL '{repository_url}'")
+    return parts[0], parts[1].removesuffix(".git")
+
+
+async def get_head_sha(repository_url: str) -> str | None:
+    """Get the commit SHA at the head of the repository's default branch.
+
+    Args:
+        repository_url (str): The repository URL.
+    Returns:
+        str | None: The commit SHA, or None if it could not be retrieved.
+    """
+    try:
+        owner, repo = parse_repository_url(repository_url)
+    except ValueError:
+        return None
+
+    client = await _get_client()
+    try:
+        response = await client.get(
+            f"/repos/{owner}/{repo}/commits/HEAD",
+            headers={"Accept": "application/vnd.github.sha"},
+        )
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+
+    return response.text.strip() or None
+
+
+async def get_terraform_cloud_provider(owner: str, repo: str, path: str, ref: str = "HEAD") -> str | None:
+    """Detect the cloud provider declared in a Terraform file.
+
+    Args:
+        owner (str): The repository owner.
+        repo (str): The repository name.
+        path (str): The path of the Terraform file in the repository.
+        ref (str): The commit, branch or tag to read the file at.
+    Returns:
+        str | None: "azure" or "aws", or None if the file declares neither provider.
+    """
+    client = await _get_client()
+    try:
+        response = await client.get(
+            f"/repos/{owner}/{repo}/contents/{quote(path)}",
+            params={"ref": ref},
+            headers={"Accept": "application/vnd.github.raw"},
+        )
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+
+    match = TERRAFORM_PROVIDER_PATTERN.search(response.text)
+    if match is None:
+        return None
+    return "azure" if match.group(1) == "azurerm" else "aws"
+
+
+async def probe_repository_iac(repository_url: str, ref: str | None = None) -> tuple[str | None, str | None]:
+    """Classify a repository from its file tree, without calling the LLM.
+
+    Any .bicep file means Bicep on Azure. Otherwise the provider block of a provider(s).tf
+    file decides the cloud provider of a Terraform repository, falling back to the first
+    other .tf file when that file has none. Files under hidden, vendored or cache directories are ignored.
+
+    Args:
+        repository_url (str): The repository URL.
+        ref (str | None): The commit to inspect, defaults to the head of the default branch.
+    Returns:
+        tuple[str | None, str | None]: The IaC type and cloud provider. Either is None when
+            the tree does not decide it (e.g. it could not be retrieved, it is truncated and
+            has no .bicep file, or the provider is unclear).
+    """
+    try:
+        owner, repo = parse_repository_url(repository_url)
+    except ValueError:
+        return None, None
+
+    ref = ref or "HEAD"
+    client = await _get_client()
+    try:
+        response = await client.get(
+            f"/repos/{owner}/{repo}/git/trees/{ref}",
+            params={"recursive": "1"},
+            headers={"Accept": "application/vnd.github+json"},
+        )
+        response.raise_for_status()
+        tree = orjson.loads(response.content)
+    except (httpx.HTTPError, orjson.JSONDecodeError):
+        return None, None
+
+    terraform_path = None
+    provider_path = None
+    # Entries are listed depth-first, so an excluded directory's contents follow it contiguously
+    excluded_prefix = None
+    for entry in tree.get("tree", ()):
+        path = entry.get("path", "")
+        if excluded_prefix is not None and path.startswith(excluded_prefix):
+            continue
+        if entry.get("type") == "tree":
+            name = path.rpartition("/")[2]
+            if name[:1] == "." or name in _EXCLUDED_DIRS:
+                excluded_prefix = path + "/"
+            continue
+        # Reject non-IaC files with a single C-level suffix check
+        if entry.get("type") != "blob" or not path.endswith(_IAC_SUFFIXES):
+            continue
+        iac_type = _IAC_TYPE_BY_EXTENSION.get(path.rpartition(".")[2])
+        if iac_type == "bicep":
+            return "bicep", "azure"
+        if iac_type == "terraform":
+            # Provider blocks usually live in provider(s).tf, so prefer it over the first .tf file
+            name = path.rpartition("/")[2]
+            if provider_path is None and ("provider" in name or "Provider" in name):
+                provider_path = path
+            elif terraform_path is None:
+                terraform_path = path
+
+    if tree.get("truncated"):
+        # Part of the tree is missing and may hold a .bicep file, so only a .bicep match is conclusive
+        return None, None
+    cloud_provider = None
+    if provider_path is not None:
+        cloud_provider = await get_terraform_cloud_provider(owner, repo, provider_path, ref)
+    # A provider-named file may only hold required_providers, with the provider block elsewhere
+    if cloud_provider is None and terraform_path is not None:
+        cloud_provider = await get_terraform_cloud_provider(owner, repo, terraform_path, ref)
+    if provider_path is not None or terraform_path is not None:
+        return "terraform", cloud_provider
+    return "none", "none"
@@ -1,292 +1,578 @@
 import asyncio
+import random
+from typing import Literal, get_args
 from typing_extensions import Never
 from agent_framework import WorkflowBuilder, WorkflowContext, WorkflowOutputEvent, executor
 from agent_framework.devui import serve
 import logging
-from dotenv import load_dotenv
-from github_mcp_client import call_github_mcp
-from dataclasses import dataclass
+from _env import ensure_env_loaded
+from github_mcp_client import call_github_mcp, run_github_mcp
+from dataclasses import dataclass, field
+from enum import Enum
+from pydantic import BaseModel, field_validator
 from prompts_service import prompts_service
-from typing import cast
-import json
+from github_rest import get_head_sha, probe_repository_iac
+import repository_cache
+from string import Template
+import orjson
 
 
-load_dotenv(override=True)
+ensure_env_loaded()
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
 
-
-@dataclass
+# Number of concurrent pull request lookups issued per polling round
+PR_PROBE_CONCURRENCY = 2
+
+# Classification values accepted from the MCP
+IacType = Literal["bicep", "terraform", "none"]
+CloudProvider = Literal["azure", "aws", "none"]
+IAC_TYPES = frozenset(get_args(IacType))
+CLOUD_PROVIDERS = frozenset(get_args(CloudProvider))
+
+# Maximum concurrent MCP calls when classifying repositories one prompt each
+CHECK_REPOSITORIES_CONCURRENCY = 10
+
+# Pull request polling backoff (seconds) and attempt cap
+PR_POLL_INITIAL_DELAY = 0.5
+PR_POLL_MAX_DELAY = 8.0
+PR_POLL_MAX_ATTEMPTS = 20
+
+# Prompt templates, compiled once at import
+CHECK_REPOSITORY_PROMPT = Template("""
+    Check the files in the $repository_url repository.
+    Any .bicep file: iac_type 'bicep', cloud_provider 'azure'.
+    Else any .tf file: iac_type 'terraform', cloud_provider 'azure' or 'aws' from the terraform provider.
+    Else: iac_type 'none', cloud_provider 'none'.
+    Return only JSON: {"iac_type": "<iac_type>", "cloud_provider": "<cloud_provider>"}
+""")
+
+CHECK_REPOSITORIES_BATCH_PROMPT = Template("""
+    Check the files in each of these repositories (index: repository URL):
+$repositories
+    For each repository:
+    Any .bicep file: iac_type 'bicep', cloud_provider 'azure'.
+    Else any .tf file: iac_type 'terraform', cloud_provider 'azure' or 'aws' from the terraform provider.
+    Else: iac_type 'none', cloud_provider 'none'.
+    Return exactly one line per repository and nothing else: <index>,<iac_type>,<cloud_provider>
+""")
+
+ASSOCIATE_ISSUE_TO_PR_PROMPT = Template("""
+    Which pull request is associated with the issue $issue_url?
+    Provide the pull request URL, status, and description in the following JSON format:
+    {
+        "repository_url": "$repository_url",
+        "issue_url": "$issue_url",
+        "branch_name": "$branch_name",
+        "pull_request_url": "<pull_request_url>",
+        "pull_request_status": "<pull_request_status>",
+        "pull_request_description": "<pull_request_description>"
+    }
+    Only return the JSON object without any additional text.
+""")
+
+
+@dataclass(slots=True, frozen=True)
 class CheckRepositoryInput:
     repository_url: str
 
 
-@dataclass
-class CheckRepositoryOutput:
-    iac_type: str
-    cloud_provider: str
+@dataclass(slots=True, frozen=True)
+class CheckRepositoriesInput:
+    repository_urls: list[str]
+    single_prompt: bool = True  # False: one concurrent MCP call per repository
 
 
-@dataclass
-class CreateBranchOutput:
-    branch_name: str
+@dataclass(slots=True, frozen=True)
+class ClassifiedRepository:
+    repository_url: str
     iac_type: str
     cloud_provider: str
 
 
-@dataclass
-class CodeGeneratorOutput:
-    status: str  # "success", "partial_success", or "failed"
-    repository_url: str
-    branch_name: str
-    issue_url: str
-    errors: list[str]
-    warnings: list[str]
+@dataclass(slots=True, frozen=True)
+class CheckRepositoriesOutput:
+    repositories: list[ClassifiedRepository]
 
 
-@dataclass
-class PullRequestOutput:
-    repository_url: str
-    issue_url: str
-    branch_name: str
-    pull_request_url: str
-    pull_request_status: str
-    pull_request_description: str
+class RepositoryClassification(BaseModel):
+    """Structured output schema for the repository check."""
+    iac_type: IacType
+    cloud_provider: CloudProvider
 
+    @field_validator("iac_type", "cloud_provider", mode="before")
+    @classmethod
+    def _normalize(cls, value: object) -> object:
+        # Accept the model's casing and whitespace variations of the allowed values
+        return value.strip().casefold() if isinstance(value, str) else value
+
+
+class SnoozeStep(str, Enum):
+    """Trigger message sent between executors; the data itself lives in SnoozeState."""
+    REPOSITORY_CHECKED = "repository_checked"
+    NO_IAC_FOUND = "no_iac_found"
+    UNSUPPORTED_IAC = "unsupported_iac"
+    CODE_GENERATED = "code_generated"
+    PULL_REQUEST_ASSOCIATED = "pull_request_associated"
+
+
+@dataclass(slots=True)
+class SnoozeState:
+    """Workflow state shared by all executors through the workflow shared state."""
+    repository_url: str = ""
+    iac_type: str = ""
+    cloud_provider: str = ""
+    branch_name: str = ""
+    status: str = ""  # "success", "partial_success", or "failed"
+    issue_url: str = ""
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    pull_request_url: str = ""
+    pull_request_status: str = ""
+    pull_request_description: str = ""
+    code_generator_prompt: str = ""
+
+
+# Shared state key holding the SnoozeState of the current run
+SNOOZE_STATE_KEY = "state"
 
-@executor(id="check_repository")
-async def check_repository(input: CheckRepositoryInput, ctx: WorkflowContext[CheckRepositoryOutput]) -> None:
-    """Step 1: Check repository for infrastructure code.
+
+async def classify_repository(repository_url: str) -> tuple[str, str]:
+    """Detect the IaC type and cloud provider of a repository.
+
+    Reuses the cached classification if the repository head has not moved since it was made,
+    or if it is recent and the head commit cannot be retrieved. Otherwise the repository
+    file tree is probed first, and the GitHub MCP is only called when it is inconclusive.
 
     Args:
-        ctx (WorkflowContext): The workflow context.    
+        repository_url (str): The repository URL.
     Returns:
-        str: The type of infrastructure code found ('bicep', 'terraform', or 'none').
+        tuple[str, str]: The IaC type and cloud provider.
     """
+    head_sha = await get_head_sha(repository_url)
+    cached = repository_cache.get_classification(repository_url, head_sha)
+    if cached is not None:
+        logger.debug("Using cached classification for commit: %s", head_sha or "unknown")
+        return cached
+
+    # Classify from the repository file tree when it is conclusive, skipping the LLM
+    iac_type, cloud_provider = await probe_repository_iac(repository_url, head_sha)
+    if iac_type is not None and cloud_provider is not None:
+        logger.debug("Classified from the repository tree: %s, %s", iac_type, cloud_provider)
+        repository_cache.set_classification(repository_url, head_sha, iac_type, cloud_provider)
+        return iac_type, cloud_provider
 
     # Prepare prompt to check repository files
-    prompt = (f"""              
-            Search through repository files in {input.repository_url} repository.
-            If any .bicep file is present return 'bicep' and 'azure'.
-            If any .tf file is present, check the terraform provider for aws or azure and return 'terraform' and 'azure' or 'terraform' and 'aws' accordingly.
-            If none of these files are present, return 'none' and 'none'.
-            The output structure must be two just words separated by a comma: '<iac_type>,<cloud_provider>'.
-            No further explanations are needed.
-        """)
-
-    # Store repository URL in shared state for later use
-    await ctx.set_shared_state("repository_url", input.repository_url)
+    prompt = CHECK_REPOSITORY_PROMPT.substitute(repository_url=repository_url)
 
     # Call GitHub MCP to analyze the repository
-    print("Checking repository:", input.repository_url)
-    result = await call_github_mcp(prompt)
-    iac_type, cloud_provider = str(result).split(",")
-    print("Infrastructure type found:", iac_type)
-    print("Cloud provider:", cloud_provider)
+    result = await run_github_mcp(prompt, response_format=RepositoryClassification)
 
-    # Prepare output dataclass
-    output = CheckRepositoryOutput(
-        iac_type=iac_type.strip(),
-        cloud_provider=cloud_provider.strip()
-    )
+    # Use the response parsed and validated against the schema
+    classification = result.value
+    if not isinstance(classification, RepositoryClassification):
+        raise ValueError(f"Unexpected classification '{result}' for repository {repository_url}")
+    iac_type, cloud_provider = classification.iac_type, classification.cloud_provider
 
-    # Send output to the next executor
-    await ctx.send_message(output)
+    repository_cache.set_classification(repository_url, head_sha, iac_type, cloud_provider)
 
+    return iac_type, cloud_provider
+
+
+async def check_repositories(repository_urls: list[str],
+                             concurrency: int = CHECK_REPOSITORIES_CONCURRENCY) -> list[tuple[str, str]]:
+    """Classify several repositories with concurrent, individually prompted MCP calls.
+
+    All calls are scheduled up front; the semaphore keeps at most ``concurrency`` in flight.
+    A repository that cannot be classified is reported as ("unknown", "unknown").
 
-@executor(id="create_branch")
-async def create_branch(input: CheckRepositoryOutput, ctx: WorkflowContext[CreateBranchOutput]) -> None:
-    """Step 2: Create a new branch in the repository.
     Args:
-        ctx (WorkflowContext): The workflow context.
+        repository_urls (list[str]): The repository URLs.
+        concurrency (int): The maximum number of concurrent MCP calls.
     Returns:
-        output (CreateBranchOutput) with branch name.
+        list[tuple[str, str]]: The IaC type and cloud provider of each repository, in input order.
     """
-    # Get repository URL from shared state
-    repository_url = await ctx.get_shared_state("repository_url")
+    semaphore = asyncio.Semaphore(concurrency)
 
-    # Prepare prompt to create a new branch
-    prompt = (f"""
-            Follow these steps carefully:
-            1. Create a new branch in the repository: {repository_url}
-            2. Name the branch using the format: vm-snoozing-automation-<random_number>
-            3. Return only the branch name—no additional text or explanation.
-        """)
+    async def _classify(repository_url: str) -> tuple[str, str]:
+        async with semaphore:
+            try:
+                return await classify_repository(repository_url)
+            except Exception as exc:
+                # Report the repository as unknown, like the single-prompt batch does
+                logger.warning("Failed to classify repository %s: %s", repository_url, exc)
+                return "unknown", "unknown"
 
-    # Call GitHub MCP to create the branch
-    new_branch_name = await call_github_mcp(prompt)
-    print("New branch name:", new_branch_name)
+    return await asyncio.gather(*(_classify(url) for url in repository_urls))
 
-    # Prepare output dataclass
-    output = CreateBranchOutput(
-        branch_name=str(new_branch_name).strip(),
-        iac_type=input.iac_type,
-        cloud_provider=input.cloud_provider
+
+@executor(id="check_repository")
+async def check_repository(input: CheckRepositoryInput, ctx: WorkflowContext[SnoozeStep]) -> None:
+    """Step 1: Check repository for infrastructure code.
+
+    Args:
+        input (CheckRepositoryInput): The repository to check.
+        ctx (WorkflowContext): The workflow context.
+    Returns:
+        SnoozeStep: NO_IAC_FOUND if no infrastructure code was found, UNSUPPORTED_IAC if no
+            prompt template exists for it, otherwise REPOSITORY_CHECKED.
+    """
+
+    # Warm the prompt template cache while the repository is being classified
+    preload_task = asyncio.create_task(asyncio.to_thread(prompts_service.preload_templates))
+
+    # Classify the repository
+    logger.debug("Checking repository: %s", input.repository_url)
+    try:
+        iac_type, cloud_provider = await classify_repository(input.repository_url)
+    except BaseException:
+        # Don't leave the preload task behind when the run fails here
+        preload_task.cancel()
+        raise
+    logger.debug("Infrastructure type found: %s", iac_type)
+    logger.debug("Cloud provider: %s", cloud_provider)
+
+    # Start the shared state for this run
+    state = SnoozeState(
+        repository_url=input.repository_url,
+        iac_type=iac_type,
+        cloud_provider=cloud_provider
     )
 
-    # Send output to the next executor
-    await ctx.send_message(output)
+    # The prompts service decides which combinations the code generator supports
+    if iac_type == "none":
+        step = SnoozeStep.NO_IAC_FOUND
+    elif not prompts_service.supports(cloud_provider, iac_type):
+        step = SnoozeStep.UNSUPPORTED_IAC
+    else:
+        step = SnoozeStep.REPOSITORY_CHECKED
+
+    # Render the code generator prompt from the preloaded templates
+    await preload_task
+    if step == SnoozeStep.REPOSITORY_CHECKED:
+        state.code_generator_prompt = prompts_service.load_code_generator_prompt(
+            cloud_provider=cloud_provider,
+            iac_type=iac_type,
+            repository_url=input.repository_url
+        )
+
+    await ctx.set_shared_state(SNOOZE_STATE_KEY, state)
+
+    # Trigger the next executor
+    await ctx.send_message(step)
 
 
 @executor(id="code_generator")
-async def code_generator(input: CheckRepositoryOutput, ctx: WorkflowContext[CodeGeneratorOutput]) -> None:
-    """Step 3: Generate infrastructure code in the new branch.
+async def code_generator(input: SnoozeStep, ctx: WorkflowContext[SnoozeStep]) -> None:
+    """Step 2: Generate infrastructure code in a new branch.
     Args:
-        input (CheckRepositoryOutput): The input data containing IaC type and cloud provider.
+        input (SnoozeStep): The trigger from the previous executor.
         ctx (WorkflowContext): The workflow context.
     Returns:
-        output (CodeGeneratorOutput) with code generation status and details.
+        SnoozeStep: CODE_GENERATED, with the code generation details stored in the shared state.
     """
 
-    # Get repository URL from shared state
-    repository_url = await ctx.get_shared_state("repository_url")
+    # Get the run state from shared state
+    state: SnoozeState = await ctx.get_shared_state(SNOOZE_STATE_KEY)
 
-    # Prepare prompt to create a new branch
-    prompt = prompts_service.load_code_generator_prompt(
-        cloud_provider=input.cloud_provider,
-        iac_type=input.iac_type,
-        repository_url=repository_url
+    # Use the prompt prepared by check_repository (the Coding Agent creates the branch)
+    prompt = state.code_generator_prompt or prompts_service.load_code_generator_prompt(
+        cloud_provider=state.cloud_provider,
+        iac_type=state.iac_type,
+        repository_url=state.repository_url
     )
 
     # Call GitHub MCP to generate the code
     result = await call_github_mcp(prompt)
-    print("Code generation result:", result)
+    logger.debug("Code generation result: %s", result)
 
     # Parse the JSON response from the MCP
-    result_data = json.loads(str(result))
+    result_data = orjson.loads(str(result))
 
-    # Prepare output dataclass
-    output = CodeGeneratorOutput(
-        status=result_data.get("status", "failed"),
-        repository_url=result_data.get("repository_url", repository_url),
-        branch_name=result_data.get("branch_name", ""),
-        issue_url=result_data.get("issue_url", ""),
-        errors=result_data.get("errors", []),
-        warnings=result_data.get("warnings", [])
-    )
+    # Update the shared state
+    state.status = result_data.get("status", "failed")
+    state.repository_url = result_data.get("repository_url", state.repository_url)
+    state.branch_name = result_data.get("branch_name", "")
+    state.issue_url = result_data.get("issue_url", "")
+    state.errors = result_data.get("errors", [])
+    state.warnings = result_data.get("warnings", [])
+    await ctx.set_shared_state(SNOOZE_STATE_KEY, state)
 
-    # Send output to the next executor
-    await ctx.send_message(output)
+    # Trigger the next executor
+    await ctx.send_message(SnoozeStep.CODE_GENERATED)
 
 
-@executor(id="associate_issue_to_pr")
-async def associate_issue_to_pr(input: CodeGeneratorOutput, ctx: WorkflowContext[PullRequestOutput, str]) -> None:
-    """ Step 4: Associate issue to pull request.
+def _parse_pull_request(result) -> dict:
+    """Parse an MCP result and return it if it contains a pull request URL.
 
     Args:
-        input (CodeGeneratorOutput): The input data containing code generation results.
-        ctx (WorkflowContext): The workflow context.
-
+        result: The result of a pull request lookup.
     Returns:
-        PullRequestOutput: A message indicating the workflow has skipped.
+        dict: The parsed result, or an empty dict if it contains no pull request URL.
     """
+    try:
+        result_data = orjson.loads(str(result))
+    except orjson.JSONDecodeError:
+        logger.debug("Failed to parse pull request JSON: %s", result)
+        return {}
+    if result_data.get("pull_request_url", "") != "":
+        return result_data
+    return {}
 
-    # Prepare prompt to associate issue to pull request
-    prompt = (f"""
-        Which pull request is associated with the issue {input.issue_url}?
-        Provide the pull request URL, status, and description in the following JSON format:
-        {{
-            "repository_url": "{input.repository_url}",
-            "issue_url": "{input.issue_url}",
-            "branch_name": "{input.branch_name}",
-            "pull_request_url": "<pull_request_url>",
-            "pull_request_status": "<pull_request_status>",
-            "pull_request_description": "<pull_request_description>"
-        }}
-        Only return the JSON object without any additional text.
-    """)
 
-    # Call GitHub MCP to associate issue to pull request
-    result_data = {}
-    print("Associating issue to pull request...")
+async def _first_pull_request(prompt: str) -> dict:
+    """Run concurrent pull request lookups and return the first that finds a pull request.
 
-    # Retry until a valid pull request URL is found
-    while True:
+    The remaining lookups are cancelled as soon as one succeeds.
 
-        # Call GitHub MCP
-        result = await call_github_mcp(prompt)
+    Args:
+        prompt (str): The pull request lookup prompt.
+    Returns:
+        dict: The parsed result, or an empty dict if no lookup found a pull request URL.
+    """
+    pending = {asyncio.create_task(call_github_mcp(prompt)) for _ in range(PR_PROBE_CONCURRENCY)}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    logger.warning("Pull request lookup failed: %s", task.exception())
+                    continue
+                result_data = _parse_pull_request(task.result())
+                if result_data:
+                    return result_data
+        return {}
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
-        try:
-            # Parse the JSON response from the MCP
-            result_data = json.loads(str(result))
 
-            # Check if pull_request_url is present
-            if (result_data.get("pull_request_url", "") != ""):
-                print("Pull request associated successfully.")
-                break
+@executor(id="associate_issue_to_pr")
+async def associate_issue_to_pr(input: SnoozeStep, ctx: WorkflowContext[SnoozeStep]) -> None:
+    """ Step 3: Associate issue to pull request.
 
-            # If pull_request_url is empty, retry
-            print("Pull request URL is empty, retrying...")
-            # delay before retrying
-            await asyncio.sleep(5)
+    Args:
+        input (SnoozeStep): The trigger from the previous executor.
+        ctx (WorkflowContext): The workflow context.
 
-        except json.JSONDecodeError:
-            print("Failed to parse JSON, retrying...")
+    Returns:
+        SnoozeStep: PULL_REQUEST_ASSOCIATED, with the pull request details stored in the shared state.
+    """
 
-    # Prepare output dataclass
-    output = PullRequestOutput(
-        repository_url=result_data.get("repository_url", ""),
-        issue_url=result_data.get("issue_url", ""),
-        branch_name=result_data.get("branch_name", ""),
-        pull_request_url=result_data.get("pull_request_url", ""),
-        pull_request_status=result_data.get("pull_request_status", ""),
-        pull_request_description=result_data.get(
-            "pull_request_description", "")
+    # Get the run state from shared state
+    state: SnoozeState = await ctx.get_shared_state(SNOOZE_STATE_KEY)
+
+    # Prepare prompt to associate issue to pull request
+    prompt = ASSOCIATE_ISSUE_TO_PR_PROMPT.substitute(
+        repository_url=state.repository_url,
+        issue_url=state.issue_url,
+        branch_name=state.branch_name
     )
 
-    # Send output to the next executor
-    await ctx.send_message(output)
+    # Call GitHub MCP to associate issue to pull request
+    result_data = {}
+    logger.debug("Associating issue to pull request...")
+
+    # Retry with exponential backoff until a valid pull request URL is found
+    delay = PR_POLL_INITIAL_DELAY
+    for attempt in range(1, PR_POLL_MAX_ATTEMPTS + 1):
+
+        # Call GitHub MCP with concurrent probes and keep the first usable answer
+        result_data = await _first_pull_request(prompt)
+
+        # Check if pull_request_url is present
+        if result_data:
+            logger.debug("Pull request associated successfully.")
+            break
+
+        if attempt == PR_POLL_MAX_ATTEMPTS:
+            # No retry follows the last attempt, so don't wait for one
+            continue
+
+        # If pull_request_url is empty, retry
+        logger.debug("Pull request URL is empty, retrying (attempt %d/%d)...", attempt, PR_POLL_MAX_ATTEMPTS)
+        # delay with jitter before retrying
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+        delay = min(delay * 2, PR_POLL_MAX_DELAY)
+    else:
+        raise TimeoutError(
+            f"No pull request associated with issue {state.issue_url} after {PR_POLL_MAX_ATTEMPTS} attempts")
+
+    # Update the shared state
+    state.repository_url = result_data.get("repository_url", "")
+    state.issue_url = result_data.get("issue_url", "")
+    state.branch_name = result_data.get("branch_name", "")
+    state.pull_request_url = result_data.get("pull_request_url", "")
+    state.pull_request_status = result_data.get("pull_request_status", "")
+    state.pull_request_description = result_data.get("pull_request_description", "")
+    await ctx.set_shared_state(SNOOZE_STATE_KEY, state)
+
+    # Trigger the next executor
+    await ctx.send_message(SnoozeStep.PULL_REQUEST_ASSOCIATED)
 
 
 @executor(id="notify")
-async def notify(input: PullRequestOutput, ctx: WorkflowContext[Never, str]) -> None:
+async def notify(input: SnoozeStep, ctx: WorkflowContext[Never, str]) -> None:
     """Send notification about workflow completion.
 
     Args:
-        input (PullRequestOutput): The input data containing pull request details.
+        input (SnoozeStep): The trigger from the previous executor.
         ctx (WorkflowContext): The workflow context.
 
     Returns:
         str: A message indicating the workflow has completed.
     """
 
+    # Get the run state from shared state
+    state: SnoozeState = await ctx.get_shared_state(SNOOZE_STATE_KEY)
+
     # Prepare notification message
 
     output = (f"Workflow completed successfully!\n"
-              f"Repository URL: {input.repository_url}\n"
-              f"Issue URL: {input.issue_url}\n"
-              f"Branch Name: {input.branch_name}\n"
-              f"Pull Request URL: {input.pull_request_url}\n"
-              f"Pull Request Status: {input.pull_request_status}\n"
-              f"Pull Request Description: {input.pull_request_description}\n"
+              f"Repository URL: {state.repository_url}\n"
+              f"Issue URL: {state.issue_url}\n"
+              f"Branch Name: {state.branch_name}\n"
+              f"Pull Request URL: {state.pull_request_url}\n"
+              f"Pull Request Status: {state.pull_request_status}\n"
+              f"Pull Request Description: {state.pull_request_description}\n"
               )
-    print(output)
+    logger.info(output)
 
     # Log the notification message
     await ctx.yield_output(output)
 
 
 @executor(id="skip")
-async def skip(input: CheckRepositoryOutput, ctx: WorkflowContext[Never, str]) -> None:
+async def skip(input: SnoozeStep, ctx: WorkflowContext[Never, str]) -> None:
     """Skip the workflow.
 
     Args:
-        input (CheckRepositoryOutput): The input data containing IaC type and cloud provider.
+        input (SnoozeStep): The trigger from the previous executor.
         ctx (WorkflowContext): The workflow context.
 
     Returns:
         str: A message indicating the workflow has skipped.
     """
 
+    # Get the run state from shared state
+    state: SnoozeState = await ctx.get_shared_state(SNOOZE_STATE_KEY)
+
     # Prepare skip message
-    result = f"Workflow skipped. Infrastructure type: {input.iac_type}, Cloud provider: {input.cloud_provider}"
-    print(result)
+    result = f"Workflow skipped. Infrastructure type: {state.iac_type}, Cloud provider: {state.cloud_provider}"
+    logger.info(result)
 
     # Log the skip message
     await ctx.yield_output(result)
 
 
+@executor(id="check_repositories_batch")
+async def check_repositories_batch(input: CheckRepositoriesInput, ctx: WorkflowContext[CheckRepositoriesOutput]) -> None:
+    """Classify several repositories with a single GitHub MCP call.
+
+    Repositories whose head commit matches the classification cache, or whose file tree
+    decides the classification, are not sent to the MCP.
+    With ``single_prompt`` disabled, each repository gets its own concurrent MCP call instead.
+
+    Args:
+        input (CheckRepositoriesInput): The repositories to check.
+        ctx (WorkflowContext): The workflow context.
+    Returns:
+        output (CheckRepositoriesOutput) with the IaC type and cloud provider of each repository.
+    """
+    repository_urls = input.repository_urls
+
+    if not input.single_prompt:
+        # Classify each repository with its own MCP call, bounded by the concurrency cap
+        results = await check_repositories(repository_urls)
+        await ctx.send_message(CheckRepositoriesOutput(repositories=[
+            ClassifiedRepository(repository_url, iac_type, cloud_provider)
+            for repository_url, (iac_type, cloud_provider) in zip(repository_urls, results)
+        ]))
+        return
+
+    # Reuse cached classifications for repositories whose head has not moved
+    head_shas = await asyncio.gather(*(get_head_sha(url) for url in repository_urls))
+    classifications: dict[int, tuple[str, str]] = {}
+    pending: list[int] = []
+    for index, (repository_url, head_sha) in enumerate(zip(repository_urls, head_shas)):
+        cached = repository_cache.get_classification(repository_url, head_sha)
+        if cached is not None:
+            classifications[index] = cached
+        else:
+            pending.append(index)
+
+    # Classify from the repository file trees where they are conclusive
+    new_classifications: list[int] = []
+    probes = await asyncio.gather(
+        *(probe_repository_iac(repository_urls[index], head_shas[index]) for index in pending))
+    for index, (iac_type, cloud_provider) in zip(pending, probes):
+        if iac_type is not None and cloud_provider is not None:
+            classifications[index] = (iac_type, cloud_provider)
+            new_classifications.append(index)
+    pending = [index for index in pending if index not in classifications]
+
+    if pending:
+        # Classify the remaining repositories in one prompt, one output line per index
+        prompt = CHECK_REPOSITORIES_BATCH_PROMPT.substitute(
+            repositories="\n".join(f"    {index}: {repository_urls[index]}" for index in pending)
+        )
+        logger.debug("Checking repositories: %d", len(pending))
+        result = await call_github_mcp(prompt)
+
+        for line in str(result).splitlines():
+            head, _, tail = line.strip().partition(",")
+            iac_type, _, cloud_provider = tail.partition(",")
+            iac_type = iac_type.strip().casefold()
+            cloud_provider = cloud_provider.strip().casefold()
+            if iac_type not in IAC_TYPES or cloud_provider not in CLOUD_PROVIDERS:
+                continue
+            head = head.strip()
+            # isdecimal() excludes digit characters int() rejects, such as superscripts
+            index = int(head) if head.isdecimal() else -1
+            if index not in pending:
+                continue
+            classifications[index] = (iac_type, cloud_provider)
+            new_classifications.append(index)
+
+    # Cache the new classifications with one file write
+    repository_cache.set_classifications(
+        (repository_urls[index], head_shas[index], *classifications[index]) for index in new_classifications)
+
+    # Prepare output dataclass
+    output = CheckRepositoriesOutput(repositories=[
+        ClassifiedRepository(repository_url, *classifications.get(index, ("unknown", "unknown")))
+        for index, repository_url in enumerate(repository_urls)
+    ])
+
+    # Send output to the next executor
+    await ctx.send_message(output)
+
+
+@executor(id="report_classifications")
+async def report_classifications(input: CheckRepositoriesOutput, ctx: WorkflowContext[Never, str]) -> None:
+    """Report the classification of each repository.
+
+    Args:
+        input (CheckRepositoriesOutput): The classified repositories.
+        ctx (WorkflowContext): The workflow context.
+
+    Returns:
+        str: One line per repository with its IaC type and cloud provider.
+    """
+
+    # Prepare report message
+    output = "\n".join(
+        f"{repository.repository_url}: {repository.iac_type}, {repository.cloud_provider}"
+        for repository in input.repositories
+    )
+    logger.info(output)
+
+    # Log the report message
+    await ctx.yield_output(output)
+
+
 def create_workflow() -> WorkflowBuilder:
     workflow = (
         WorkflowBuilder(
@@ -294,10 +580,11 @@ def create_workflow() -> WorkflowBuilder:
             description="A branching workflow demonstrating VM snoozing POC using different infrastructure code templates.",
         )
         .add_edge(check_repository, skip,
-                  condition=lambda output:
-                      cast(CheckRepositoryOutput, output).iac_type == "none"
+                  condition=lambda output: output in (SnoozeStep.NO_IAC_FOUND, SnoozeStep.UNSUPPORTED_IAC)
+                  )
+        .add_edge(check_repository, code_generator,
+                  condition=lambda output: output == SnoozeStep.REPOSITORY_CHECKED
                   )
-        .add_edge(check_repository, code_generator)
         .add_edge(code_generator, associate_issue_to_pr)
         .add_edge(associate_issue_to_pr, notify)
         .set_start_executor(check_repository)
@@ -306,6 +593,19 @@ def create_workflow() -> WorkflowBuilder:
     return workflow
 
 
+def create_batch_workflow() -> WorkflowBuilder:
+    workflow = (
+        WorkflowBuilder(
+            name="VM Snoozing POC Repository Classification",
+            description="Detects the infrastructure code type and cloud provider of several repositories in one GitHub MCP call.",
+        )
+        .add_edge(check_repositories_batch, report_classifications)
+        .set_start_executor(check_repositories_batch)
+        .build()
+    )
+    return workflow
+
+
 def main():
     """Launch the branching workflow in DevUI."""
 
@@ -313,11 +613,13 @@ def main():
     logger.info("Available at: http://localhost:8093")
     logger.info("\nThis workflow demonstrates:")
 
-    # Create the workflow
+    # Create the workflows
     workflow = create_workflow()
+    batch_workflow = create_batch_workflow()
 
-    # Serve the workflow in DevUI
-    serve(entities=[workflow],
+    # Serve the workflows in DevUI. serve() offers no shutdown hook for workflow resources, so the
+    # shared GitHub MCP session, Azure credential and REST client are released with the process
+    serve(entities=[workflow, batch_workflow],
           port=8093,
           auto_open=True,
           mode="developer"
@@ -325,4 +627,5 @@ def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # serve() runs uvicorn on its own event loop, which already uses uvloop when it is installed
+    main()
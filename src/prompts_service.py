@@ -1,10 +1,67 @@
-import os
-from glob import glob
+from functools import lru_cache
+from pathlib import Path
+from string import Formatter
+
+# Directory holding the prompt template files
+_PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+
+@lru_cache(maxsize=32)
+def _load_template(file_path: Path) -> tuple[str, ...]:
+    """Read a prompt template file and split it around its {repository_url} fields.
+
+    The file is read and parsed once per process. Rendering is then a single
+    ``repository_url.join(parts)``. Doubled braces are unescaped as with
+    ``str.format``; any other replacement field is kept verbatim.
+
+    Args:
+        file_path (Path): The path of the prompt template file.
+    Returns:
+        tuple[str, ...]: The literal text between {repository_url} fields.
+    """
+    template = file_path.read_text(encoding="utf-8")
+
+    parts = [""]
+    for literal, field_name, format_spec, conversion in Formatter().parse(template):
+        parts[-1] += literal
+        if field_name is None:
+            continue
+        if field_name == "repository_url":
+            parts.append("")
+        else:
+            parts[-1] += ("{" + field_name
+                          + (f"!{conversion}" if conversion else "")
+                          + (f":{format_spec}" if format_spec else "") + "}")
+    return tuple(parts)
 
 
 class PromptsService:
     def __init__(self):
-        self.PROMPTS_DIR = os.path.join((os.path.dirname(__file__)), 'prompts')
+        # Prompt template file for each (cloud_provider, iac_type) combination
+        self._dispatch = {
+            ("azure", "terraform"): "azure_tf.prompty",
+            ("azure", "bicep"): "azure_bicep.prompty",
+            ("aws", "terraform"): "aws_tf.prompty",
+        }
+
+    def preload_templates(self) -> None:
+        """Load and parse every available prompt template into the template cache."""
+        for file_name in self._dispatch.values():
+            file_path = _PROMPTS_DIR / file_name
+            if file_path.exists():
+                _load_template(file_path)
+
+    def supports(self, cloud_provider: str, iac_type: str) -> bool:
+        """Return whether a code generator prompt exists for the combination.
+
+        Args:
+            cloud_provider (str): The cloud provider (e.g., "azure" or "aws").
+            iac_type (str): The infrastructure as code type (e.g., "terraform" or "bicep").
+        Returns:
+            bool: True if the combination has a prompt template file.
+        """
+        file_name = self._dispatch.get((cloud_provider.casefold(), iac_type.casefold()))
+        return file_name is not None and (_PROMPTS_DIR / file_name).exists()
 
     def load_code_generator_prompt(self, cloud_provider: str, iac_type: str,
                                    repository_url: str) -> str:
@@ -18,24 +75,14 @@ class PromptsService:
             str: The filled prompt template.
         """
         # Load the prompt template from a file
-        file_name = ""
-
-        if cloud_provider == "azure" and iac_type == "terraform":
-            file_name = "azure_tf.prompty"
-        elif cloud_provider == "azure" and iac_type == "bicep":
-            file_name = "azure_bicep.prompty"
-        elif cloud_provider == "aws" and iac_type == "terraform":
-            file_name = "aws_tf.prompty"
-        else:
+        file_name = self._dispatch.get((cloud_provider.casefold(), iac_type.casefold()))
+        if file_name is None:
             raise ValueError(
                 f"Unsupported combination of cloud_provider '{cloud_provider}' and iac_type '{iac_type}'")
 
-        with open(os.path.join(self.PROMPTS_DIR, file_name), "r") as file:
-            prompt_template = file.read()
+        prompt_parts = _load_template(_PROMPTS_DIR / file_name)
         # Fill in the repository URL
-        prompt = prompt_template.format(
-            repository_url=repository_url
-        )
+        prompt = repository_url.join(prompt_parts)
 
         return prompt
 
@@ -0,0 +1,112 @@
+import os
+import time
+import orjson
+import tempfile
+from collections.abc import Iterable
+from itertools import islice
+from pathlib import Path
+
+# On-disk cache of repository classifications, keyed by repository URL
+REPOSITORY_CACHE_PATH = Path.home() / ".cache" / "vm-snooze" / "repo-iac.json"
+
+# How long a classification is trusted when the repository head commit is unknown
+REPOSITORY_CACHE_TTL_SECONDS = 60 * 60
+
+# Maximum number of cached repositories; the least recently used are evicted first
+REPOSITORY_CACHE_MAX_ENTRIES = 1024
+
+# In-process copy of the on-disk cache, loaded on first use
+_cache: dict | None = None
+
+
+def _get_cache() -> dict:
+    global _cache
+    if _cache is None:
+        try:
+            cache = orjson.loads(REPOSITORY_CACHE_PATH.read_bytes())
+        except (OSError, ValueError):
+            cache = {}
+        _cache = cache if isinstance(cache, dict) else {}
+    return _cache
+
+
+def _write_cache(cache: dict) -> None:
+    """Write the cache file atomically, so readers never see a partially written file."""
+    try:
+        REPOSITORY_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=REPOSITORY_CACHE_PATH.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(orjson.dumps(cache))
+            os.replace(tmp_path, REPOSITORY_CACHE_PATH)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+
+
+def get_classification(repository_url: str, head_sha: str | None) -> tuple[str, str] | None:
+    """Get the cached classification of a repository.
+
+    With a head commit SHA the entry must have been recorded at that commit. Without one,
+    any entry younger than REPOSITORY_CACHE_TTL_SECONDS is returned.
+
+    Args:
+        repository_url (str): The repository URL.
+        head_sha (str | None): The current head commit SHA of the repository, if known.
+    Returns:
+        tuple[str, str] | None: The cached (iac_type, cloud_provider), or None on a miss.
+    """
+    cache = _get_cache()
+    entry = cache.get(repository_url)
+    if not isinstance(entry, dict):
+        return None
+    if head_sha is not None:
+        if entry.get("head_sha") != head_sha:
+            return None
+    elif time.time() - entry.get("created_at", 0) > REPOSITORY_CACHE_TTL_SECONDS:
+        return None
+    # Mark the entry as most recently used; the order is saved with the next write
+    cache[repository_url] = cache.pop(repository_url)
+    return entry.get("iac_type", "none"), entry.get("cloud_provider", "none")
+
+
+def set_classification(repository_url: str, head_sha: str | None, iac_type: str, cloud_provider: str) -> None:
+    """Store the classification of a repository.
+
+    Args:
+        repository_url (str): The repository URL.
+        head_sha (str | None): The head commit SHA the classification was made at, if known.
+        iac_type (str): The infrastructure as code type.
+        cloud_provider (str): The cloud provider.
+    """
+    set_classifications([(repository_url, head_sha, iac_type, cloud_provider)])
+
+
+def set_classifications(classifications: Iterable[tuple[str, str | None, str, str]]) -> None:
+    """Store the classifications of several repositories with a single cache file write.
+
+    Args:
+        classifications (Iterable[tuple[str, str | None, str, str]]): The repository URL, head
+            commit SHA, IaC type and cloud provider of each repository.
+    """
+    cache = _get_cache()
+    created_at = time.time()
+    written = False
+    for repository_url, head_sha, iac_type, cloud_provider in classifications:
+        cache.pop(repository_url, None)
+        cache[repository_url] = {
+            "iac_type": iac_type,
+            "cloud_provider": cloud_provider,
+            "head_sha": head_sha,
+            "created_at": created_at,
+        }
+        written = True
+    if not written:
+        return
+
+    # Evict the least recently used entries beyond the size cap
+    for repository_url in list(islice(cache, max(len(cache) - REPOSITORY_CACHE_MAX_ENTRIES, 0))):
+        del cache[repository_url]
+    _write_cache(cache)
@@ -1,8 +1,53 @@
 import asyncio
+from contextlib import AsyncExitStack
 from agent_framework import ChatAgent, MCPStreamableHTTPTool
 from agent_framework.azure import AzureOpenAIChatClient
-from dotenv import load_dotenv
-load_dotenv(override=True)
+from github_mcp_client import create_http2_client
+from _loop_local import LoopLocal
+from _env import ensure_env_loaded
+
+# Shared MCP tool and agent per GitHub token, created once per event loop
+_agents: LoopLocal[tuple[ChatAgent, MCPStreamableHTTPTool]] = LoopLocal()
+
+
+async def _get_agent(github_token: str) -> tuple[ChatAgent, MCPStreamableHTTPTool]:
+    """Return the shared agent and MCP tool for a token, connecting on first use.
+
+    Agents of other tokens stay open, as other callers may still be using them.
+    """
+    async def _create_agent(exit_stack: AsyncExitStack) -> tuple[ChatAgent, MCPStreamableHTTPTool]:
+        mcp_tool = await exit_stack.enter_async_context(
+            MCPStreamableHTTPTool(
+                name="github-mcp",
+                url="https://api.githubcopilot.com/mcp",
+                headers={
+                    "Authorization": f"Bearer {github_token}",
+                    "Content-Type": "application/json"
+                },
+                httpx_client_factory=create_http2_client,
+            )
+        )
+        agent = await exit_stack.enter_async_context(
+            ChatAgent(
+                chat_client=AzureOpenAIChatClient(
+                    endpoint="https://models.github.ai/inference",
+                    deployment_name="openai/gpt-4.1-mini",
+                    api_key=github_token
+                ),
+                name="GitHubAgent",
+                instructions="You are a helpful assistant that can interact with GitHub repositories. "
+                            "Use the available GitHub MCP tools to help users with repository operations.",
+            )
+        )
+        return agent, mcp_tool
+
+    return await _agents.get(_create_agent, key=github_token)
+
+
+async def aclose() -> None:
+    """Close the shared agents and MCP tools of the running event loop."""
+    await _agents.aclose()
+
 
 async def use_github_mcp_server(query: str, github_token: str) -> str:
     """
@@ -21,28 +66,9 @@ async def use_github_mcp_server(query: str, github_token: str) -> str:
             "ghp_yourtoken"
         )
     """
-    async with (
-        MCPStreamableHTTPTool(
-            name="github-mcp",
-            url="https://api.githubcopilot.com/mcp",
-            headers={
-                "Authorization": f"Bearer {github_token}",
-                "Content-Type": "application/json"
-            },
-        ) as mcp_server,
-        ChatAgent(
-            chat_client=AzureOpenAIChatClient(
-                endpoint="https://models.github.ai/inference",
-                deployment_name="openai/gpt-4.1-mini",
-                api_key=github_token
-            ),
-            name="GitHubAgent",
-            instructions="You are a helpful assistant that can interact with GitHub repositories. "
-                        "Use the available GitHub MCP tools to help users with repository operations.",
-        ) as agent,
-    ):
-        result = await agent.run(query, tools=mcp_server)
-        return result
+    agent, mcp_tool = await _get_agent(github_token)
+    result = await agent.run(query, tools=mcp_tool)
+    return result
 
 
 async def example_usage():
@@ -56,11 +82,15 @@ async def example_usage():
         "List the branches in my repository"
     ]
     
-    for query in queries:
-        print(f"\nQuery: {query}")
-        result = await use_github_mcp_server(query, github_token)
-        print(f"Result: {result}")
+    try:
+        for query in queries:
+            print(f"\nQuery: {query}")
+            result = await use_github_mcp_server(query, github_token)
+            print(f"Result: {result}")
+    finally:
+        await aclose()
 
 
 if __name__ == "__main__":
+    ensure_env_loaded()
     asyncio.run(example_usage())